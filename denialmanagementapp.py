@@ -1,6 +1,11 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
+import plotly.graph_objects as go
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
 from io import BytesIO
 
 # ---------------- PAGE CONFIG ----------------
@@ -15,24 +20,220 @@ EXPECTED_COLUMNS = [
     "Approved_Amount", "Denied_amount", "Denial_reason"
 ]
 
+# Explicit Arrow types so the CSV is parsed in one multithreaded pass. claim_date and
+# Patient_Age are read as text and coerced afterwards, so a stray value becomes NaT/NaN
+# instead of failing the whole upload.
+COLUMN_TYPES = {
+    "ICD10_Code": pa.string(), "CPT_Code": pa.string(), "claim_date": pa.string(),
+    "Patient_Age": pa.string(), "Gender": pa.string(), "Region": pa.string(),
+    "Provider_Specialty": pa.string(), "Hospital_Type": pa.string(), "Claim_Status": pa.string(),
+    "Claimed_Amount": pa.float64(), "Approved_Amount": pa.float64(),
+    "Denied_amount": pa.float64(), "Denial_reason": pa.string()
+}
+
+# Low-cardinality text columns, held as pandas Categoricals (integer codes)
+CATEGORICAL_COLUMNS = [
+    "Region", "Gender", "Hospital_Type", "Claim_Status", "Provider_Specialty", "Denial_reason"
+]
+
+# Streamlit re-executes this script on every rerun, so module scope alone is not
+# enough; cache_resource builds the sample file once per server process.
+@st.cache_resource
+def sample_csv_bytes():
+    """Small sample claims file offered for download on the Home page."""
+    return pd.DataFrame({
+        "ICD10_Code": ["A00", "B00"],
+        "CPT_Code": ["12345", "67890"],
+        "claim_date": ["2025-01-01", "2025-02-15"],
+        "Patient_Age": [34, 45],
+        "Gender": ["M", "F"],
+        "Region": ["North", "South"],
+        "Provider_Specialty": ["Cardiology", "Orthopedics"],
+        "Hospital_Type": ["Private", "Public"],
+        "Claim_Status": ["Approved", "Denied"],
+        "Claimed_Amount": [1000, 2000],
+        "Approved_Amount": [1000, 0],
+        "Denied_amount": [0, 2000],
+        "Denial_reason": ["", "Missing info"]
+    }).to_csv(index=False).encode()
+
 @st.cache_data
 def load_data(uploaded_file):
-    df = pd.read_csv(uploaded_file)
-    missing_cols = [col for col in EXPECTED_COLUMNS if col not in df.columns]
+    # Probe just the header with the streaming reader (one small block), so a file
+    # missing columns fails before its body is parsed
+    header = pacsv.open_csv(uploaded_file, read_options=pacsv.ReadOptions(block_size=1 << 20)).schema.names
+    columns = set(header)
+    missing_cols = [col for col in EXPECTED_COLUMNS if col not in columns]
     if missing_cols:
         raise ValueError(f"The uploaded file is missing these columns: {', '.join(missing_cols)}")
-    if "claim_date" in df.columns:
-        df["claim_date"] = pd.to_datetime(df["claim_date"], errors="coerce")
+
+    # Extra columns are kept as text rather than left to type inference
+    column_types = {col: COLUMN_TYPES.get(col, pa.string()) for col in header}
+    uploaded_file.seek(0)
+    table = pacsv.read_csv(
+        uploaded_file,
+        read_options=pacsv.ReadOptions(use_threads=True, block_size=16 << 20),
+        convert_options=pacsv.ConvertOptions(column_types=column_types, strings_can_be_null=True),
+    )
+    df = table.to_pandas(categories=CATEGORICAL_COLUMNS, self_destruct=True, split_blocks=True)
+    del table
+    df["claim_date"] = pd.to_datetime(df["claim_date"], errors="coerce")
+    df["Patient_Age"] = pd.to_numeric(df["Patient_Age"], errors="coerce", downcast="integer")
     return df
 
-def download_button(df, filename="filtered_results.csv"):
-    """Provide download buttons for CSV and Excel."""
-    csv = df.to_csv(index=False).encode("utf-8")
+def to_ipc(df):
+    """Serialize the frame as an Arrow IPC stream for the other pages.
+
+    Reading it back is a memcpy-level decode rather than a pickle or Parquet
+    decompression. Built outside load_data so cache hits don't carry a second copy.
+    """
+    sink = pa.BufferOutputStream()
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+@st.cache_data(show_spinner=False)
+def filter_choices(data_id, _df, cols=("Region", "Provider_Specialty")):
+    """Sidebar options and claim date bounds, computed once per upload."""
+    choices = {col: sorted(_df[col].cat.categories.tolist()) for col in cols}
+    return choices, (_df["claim_date"].min(), _df["claim_date"].max())
 
+def filter_sidebar(df):
+    """Render the shared sidebar filters; returns the filter key and filtered frame."""
+    st.sidebar.header("🔍 Filters")
+
+    choices, (min_date, max_date) = filter_choices(st.session_state.data_id, df)
+    regions = choices["Region"]
+    specialties = choices["Provider_Specialty"]
+
+    selected_region = st.sidebar.multiselect("Select Region(s)", regions, default=regions)
+    selected_specialty = st.sidebar.multiselect("Select Specialty(ies)", specialties, default=specialties)
+
+    if "claim_date" in df.columns:
+        selected_date = st.sidebar.date_input("Select Date Range", [min_date, max_date])
+    else:
+        selected_date = None
+
+    filter_key = (st.session_state.data_id, tuple(selected_region), tuple(selected_specialty),
+                  tuple(selected_date or ()))
+    return filter_key, df.loc[filter_mask(filter_key, df)]
+
+# Pages load different column subsets of the same rows, so the row mask is what gets cached
+@st.cache_data(show_spinner=False, max_entries=16)
+def filter_mask(filter_key, _df):
+    """AND the region, specialty and date filters into one boolean row mask."""
+    _, selected_region, selected_specialty, selected_date = filter_key
+    mask = np.ones(len(_df), dtype=bool)
+    if selected_region:
+        mask &= _df["Region"].isin(selected_region).to_numpy()
+    if selected_specialty:
+        mask &= _df["Provider_Specialty"].isin(selected_specialty).to_numpy()
+    if selected_date:
+        # Compare the raw datetime64[ns] buffer against ns scalars (no Timestamp objects)
+        date_arr = _df["claim_date"].to_numpy("datetime64[ns]")
+        lo = np.datetime64(selected_date[0], "ns")
+        hi = np.datetime64(selected_date[1], "ns")
+        mask &= (date_arr >= lo) & (date_arr <= hi)
+    return mask
+
+def denied_totals(view, key):
+    """Denied amount per `key` via Arrow's hash aggregation; missing keys form their own group.
+
+    `view` is the narrow [key, "Denied_amount"] projection of the filtered frame.
+    """
+    # from_pandas reuses the categorical codes as dictionary indices and the float buffer as-is
+    table = pa.Table.from_pandas(view, preserve_index=False)
+    totals = table.group_by(key).aggregate(
+        [("Denied_amount", "sum", pc.ScalarAggregateOptions(min_count=0))]
+    )
+    return pa.table({
+        key: totals[key].cast(pa.string()),
+        "Denied_amount": totals["Denied_amount_sum"],
+    }).to_pandas()
+
+# Chart aggregations are cached on the filter key, so reruns that leave the
+# filters alone (e.g. toggling the export switch) skip the scans entirely.
+@st.cache_data(show_spinner=False, max_entries=16)
+def monthly_trend(filter_key, _dates, _amounts):
+    """Monthly denied totals, bucketed by month offset and summed with one bincount."""
+    dates = _dates.astype("datetime64[M]")
+    amounts = _amounts.astype("float64")
+    valid = ~np.isnat(dates) & ~np.isnan(amounts)
+    dates, amounts = dates[valid], amounts[valid]
+    if len(dates):
+        start = dates.min()
+        codes = (dates - start).astype(np.int64)
+        sums = np.bincount(codes, weights=amounts)
+        months = start + np.arange(len(sums))
+    else:
+        sums, months = np.array([]), np.array([], dtype="datetime64[M]")
+    return pd.DataFrame({"claim_date": months.astype("datetime64[ns]"), "Denied_amount": sums})
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def top_denial_reasons(filter_key, _reasons_view, n=10):
+    """Top reasons by denied amount, with missing reasons bucketed as Unknown."""
+    reason_totals = denied_totals(_reasons_view, "Denial_reason").set_index("Denial_reason")["Denied_amount"]
+    # Relabel the missing-reason group on the small grouped result, not the column
+    reason_totals.index = reason_totals.index.astype("object").fillna("Unknown")
+    return (
+        reason_totals.groupby(level=0, sort=False)
+        .sum()
+        .nlargest(n)
+        .reset_index()
+    )
+
+# Export builders are cached on a cheap key (upload + filter values + file name);
+# the frame itself is skipped by Streamlit's hasher via the leading underscore.
+@st.cache_data(show_spinner=False, max_entries=8)
+def export_parquet(cache_key, _df):
+    """zstd level 3: several times smaller than CSV and far quicker to write than xlsx."""
     buffer = BytesIO()
-    with pd.ExcelWriter(buffer, engine="xlsxwriter") as writer:
-        df.to_excel(writer, index=False, sheet_name="Filtered Results")
-    excel_data = buffer.getvalue()
+    _df.to_parquet(buffer, engine="pyarrow", compression="zstd", compression_level=3, index=False)
+    return buffer.getvalue()
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def export_csv(cache_key, _df):
+    return _df.to_csv(index=False).encode("utf-8")
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def export_excel(cache_key, _df):
+    """Stream the frame into an xlsx workbook without going through to_excel."""
+    # Convert each column to Python values once (missing -> None, written as blank)
+    columns = [_df[col].astype(object).where(_df[col].notna(), None).tolist() for col in _df.columns]
+
+    buffer = BytesIO()
+    options = {"constant_memory": True, "strings_to_urls": False,
+               "default_date_format": "yyyy-mm-dd hh:mm:ss"}
+    with pd.ExcelWriter(buffer, engine="xlsxwriter", engine_kwargs={"options": options}) as writer:
+        sheet = writer.book.add_worksheet("Filtered Results")
+        sheet.write_row(0, 0, list(_df.columns), writer.book.add_format({"bold": True}))
+        # constant_memory flushes each finished row, so cells must be written row by row
+        for row_idx, row in enumerate(zip(*columns), start=1):
+            sheet.write_row(row_idx, 0, row)
+    return buffer.getvalue()
+
+def download_button(df, filename="filtered_results.csv", cache_key=None):
+    """Provide a Parquet download, with CSV and Excel built on request."""
+    cache_key = (cache_key, filename)
+
+    st.download_button(
+        label="⬇️ Download Parquet (smaller, faster)",
+        data=export_parquet(cache_key, df),
+        file_name=filename.replace(".csv", ".parquet"),
+        mime="application/vnd.apache.parquet",
+        use_container_width=True
+    )
+    spreadsheet_downloads(df, filename, cache_key)
+
+@st.fragment
+def spreadsheet_downloads(df, filename, cache_key):
+    """CSV/Excel are slow to serialize, so only build them once the user asks."""
+    if not st.toggle("Prepare CSV and Excel downloads", key=f"prepare_{filename}"):
+        return
+
+    csv = export_csv(cache_key, df)
+    excel_data = export_excel(cache_key, df)
 
     st.download_button(
         label="⬇️ Download CSV",
@@ -54,8 +255,9 @@ st.sidebar.image("tag3.gif", width=200, caption="Welcome!")
 
 menu = st.sidebar.radio("Go to", ["Home", " Top Denial Reasons"])
 
-if "data" not in st.session_state:
-    st.session_state.data = None
+if "data_ipc" not in st.session_state:
+    st.session_state.data_ipc = None
+    st.session_state.data_id = None
 
 # ---------------- HOME PAGE ----------------
 if menu == "Home":
@@ -73,37 +275,13 @@ if menu == "Home":
     )
     st.markdown("---")
 
-    #New line starts here
-    import pandas as pd
-    import io
-    # Create a small sample DataFrame
-    sample_data = pd.DataFrame({
-    "ICD10_Code": ["A00", "B00"],
-    "CPT_Code": ["12345", "67890"],
-    "claim_date": ["2025-01-01", "2025-02-15"],
-    "Patient_Age": [34, 45],
-    "Gender": ["M", "F"],
-    "Region": ["North", "South"],
-    "Provider_Specialty": ["Cardiology", "Orthopedics"],
-    "Hospital_Type": ["Private", "Public"],
-    "Claim_Status": ["Approved", "Denied"],
-    "Claimed_Amount": [1000, 2000],
-    "Approved_Amount": [1000, 0],
-    "Denied_amount": [0, 2000],
-    "Denial_reason": ["", "Missing info"]
-    })
-    # Convert to CSV in-memory
-    csv_buffer = io.StringIO()
-    sample_data.to_csv(csv_buffer, index=False)
-    csv_bytes = csv_buffer.getvalue().encode()
     # Add a download button above the upload
     st.download_button(
     label="📥 Download Sample CSV File",
-    data=csv_bytes,
+    data=sample_csv_bytes(),
     file_name="sample_claims.csv",
     mime="text/csv"
     )
-#new line ends here
     # ---- CSV UPLOAD WITH RIGHT-SIDE SMALL FONT PROMPT ----
     left_col, right_col = st.columns([2, 1])  # left wider than right
 
@@ -128,39 +306,21 @@ if menu == "Home":
     if uploaded_file is not None:
         try:
             df = load_data(uploaded_file)
-            st.session_state.data = df
+            # Serialize for the other pages once per upload, not on every rerun
+            if uploaded_file.file_id != st.session_state.data_id:
+                st.session_state.data_ipc = to_ipc(df)
+                st.session_state.data_id = uploaded_file.file_id
             st.success(f"✅ File uploaded successfully! {df.shape[0]} records loaded.")
             st.markdown("---")
         except Exception as e:
             st.error(f"⚠️ Error loading file: {e}")
-            st.info("Please make sure your CSV has exactly these columns:\n\n" +
-                ", ".join(EXPECTED_COLUMNS))
+            if not isinstance(e, pa.ArrowException):
+                st.info("Please make sure your CSV has exactly these columns:\n\n" +
+                    ", ".join(EXPECTED_COLUMNS))
+            st.stop()
             
             # -------- FILTERS --------
-        st.sidebar.header("🔍 Filters")
-
-        regions = df["Region"].dropna().unique().tolist()
-        specialties = df["Provider_Specialty"].dropna().unique().tolist()
-
-        selected_region = st.sidebar.multiselect("Select Region(s)", regions, default=regions)
-        selected_specialty = st.sidebar.multiselect("Select Specialty(ies)", specialties, default=specialties)
-
-        if "claim_date" in df.columns:
-            min_date = df["claim_date"].min()
-            max_date = df["claim_date"].max()
-            selected_date = st.sidebar.date_input("Select Date Range", [min_date, max_date])
-        else:
-            selected_date = None
-
-        filtered_df = df.copy()
-        if selected_region:
-            filtered_df = filtered_df[filtered_df["Region"].isin(selected_region)]
-        if selected_specialty:
-            filtered_df = filtered_df[filtered_df["Provider_Specialty"].isin(selected_specialty)]
-        if selected_date:
-            filtered_df = filtered_df[
-                filtered_df["claim_date"].between(pd.to_datetime(selected_date[0]), pd.to_datetime(selected_date[1]))
-            ]
+        filter_key, filtered_df = filter_sidebar(df)
 
         # -------- KPIs --------
         st.markdown("### 📊 Key Metrics")
@@ -178,8 +338,13 @@ if menu == "Home":
         # -------- CHARTS --------
         st.markdown("### 📈 Claim Status Distribution")
         if "Claim_Status" in filtered_df.columns:
-            status_chart = filtered_df["Claim_Status"].value_counts().reset_index()
-            status_chart.columns = ["Claim_Status", "Count"]
+            # Count straight off the categorical codes (-1 marks missing values)
+            cat = filtered_df["Claim_Status"].cat
+            codes = cat.codes.to_numpy()
+            counts = np.bincount(codes[codes >= 0], minlength=len(cat.categories))
+            status_chart = pd.DataFrame({"Claim_Status": cat.categories, "Count": counts})
+            # Categories span the whole upload; only chart statuses present after filtering
+            status_chart = status_chart[status_chart["Count"] > 0]
             fig = px.pie(status_chart, names="Claim_Status", values="Count",
                          title="Claim Status Breakdown", color_discrete_sequence=px.colors.qualitative.Set2)
             st.plotly_chart(fig, use_container_width=True)
@@ -187,83 +352,66 @@ if menu == "Home":
         # Denied amount by region
         st.markdown("### 💸 Denied Amount by Region")
         if "Region" in filtered_df.columns:
-            denied_by_region = filtered_df.groupby("Region")["Denied_amount"].sum().reset_index()
-            fig2 = px.bar(denied_by_region, x="Region", y="Denied_amount",
-                          title="Denied Amount by Region", text_auto=True)
+            region_view = filtered_df[["Region", "Denied_amount"]]
+            denied_by_region = denied_totals(region_view, "Region").dropna(subset=["Region"])
+            fig2 = go.Figure(go.Bar(x=denied_by_region["Region"].to_numpy(),
+                                    y=denied_by_region["Denied_amount"].to_numpy(),
+                                    texttemplate="%{y}"))
+            fig2.update_layout(title="Denied Amount by Region",
+                               xaxis_title="Region", yaxis_title="Denied_amount")
             st.plotly_chart(fig2, use_container_width=True)
 
         # -------- NEW: Denial Trend Over Time --------
         st.markdown("### 📆 Denial Trend Over Time")
         if "claim_date" in filtered_df.columns:
-            trend = (
-                filtered_df.groupby(pd.Grouper(key="claim_date", freq="M"))["Denied_amount"]
-                .sum()
-                .reset_index()
-                .sort_values("claim_date")
-            )
-            fig3 = px.line(trend, x="claim_date", y="Denied_amount",
-                           markers=True,
-                           title="Monthly Denied Amount Trend")
+            trend = monthly_trend(filter_key, filtered_df["claim_date"].to_numpy(),
+                                  filtered_df["Denied_amount"].to_numpy())
+            # WebGL trace fed with raw arrays, so long daily ranges stay responsive
+            fig3 = go.Figure(go.Scattergl(x=trend["claim_date"].to_numpy(),
+                                          y=trend["Denied_amount"].to_numpy(),
+                                          mode="lines+markers"))
+            fig3.update_layout(title="Monthly Denied Amount Trend",
+                               xaxis_title="claim_date", yaxis_title="Denied_amount")
             st.plotly_chart(fig3, use_container_width=True)
 
         # -------- DOWNLOAD SECTION --------
         st.markdown("### 💾 Download Filtered Results")
-        download_button(filtered_df, filename="filtered_claims.csv")
+        download_button(filtered_df, filename="filtered_claims.csv", cache_key=filter_key)
 
 # ---------------- TOP DENIAL REASONS ----------------
 elif menu == " Top Denial Reasons":
     st.title("📊 Top Denial Reasons")
 
-    if st.session_state.data is None:
+    if st.session_state.data_ipc is None:
         st.warning("⚠️ Please upload a CSV file first from the Home page.")
     else:
-        df = st.session_state.data
+        data_table = pa.ipc.open_stream(st.session_state.data_ipc).read_all()
+        # Filters and charts only need these columns; the export uses the full table below
+        df = (
+            data_table
+            .select(["Region", "Provider_Specialty", "claim_date", "Denial_reason", "Denied_amount"])
+            .to_pandas(split_blocks=True)
+        )
 
         # -------- FILTERS --------
-        st.sidebar.header("🔍 Filters")
-
-        regions = df["Region"].dropna().unique().tolist()
-        specialties = df["Provider_Specialty"].dropna().unique().tolist()
-
-        selected_region = st.sidebar.multiselect("Select Region(s)", regions, default=regions)
-        selected_specialty = st.sidebar.multiselect("Select Specialty(ies)", specialties, default=specialties)
-
-        if "claim_date" in df.columns:
-            min_date = df["claim_date"].min()
-            max_date = df["claim_date"].max()
-            selected_date = st.sidebar.date_input("Select Date Range", [min_date, max_date])
-        else:
-            selected_date = None
-
-        filtered_df = df.copy()
-        if selected_region:
-            filtered_df = filtered_df[filtered_df["Region"].isin(selected_region)]
-        if selected_specialty:
-            filtered_df = filtered_df[filtered_df["Provider_Specialty"].isin(selected_specialty)]
-        if selected_date:
-            filtered_df = filtered_df[
-                filtered_df["claim_date"].between(pd.to_datetime(selected_date[0]), pd.to_datetime(selected_date[1]))
-            ]
+        filter_key, filtered_df = filter_sidebar(df)
 
         # -------- TOP DENIAL REASONS --------
-        filtered_df["Denial_reason"].fillna("Unknown", inplace=True)
-        denial_summary = (
-            filtered_df.groupby("Denial_reason")["Denied_amount"]
-            .sum()
-            .reset_index()
-            .sort_values("Denied_amount", ascending=False)
-            .head(10)
-        )
+        reasons_view = filtered_df[["Denial_reason", "Denied_amount"]]
+        denial_summary = top_denial_reasons(filter_key, reasons_view)
 
-        fig3 = px.bar(
-            denial_summary,
-            x="Denied_amount",
-            y="Denial_reason",
+        fig3 = go.Figure(go.Bar(
+            x=denial_summary["Denied_amount"].to_numpy(),
+            y=denial_summary["Denial_reason"].to_numpy(),
             orientation="h",
+            texttemplate="%{x:.2s}",
+        ))
+        fig3.update_layout(
             title="Top Denial Reasons (by Denied Amount)",
-            text_auto=".2s",
+            xaxis_title="Denied_amount",
+            yaxis_title="Denial_reason",
+            yaxis={"categoryorder": "total ascending"},
         )
-        fig3.update_layout(yaxis={"categoryorder": "total ascending"})
         st.plotly_chart(fig3, use_container_width=True)
 
         st.markdown("### 📋 Detailed Denial Data")
@@ -271,4 +419,6 @@ elif menu == " Top Denial Reasons":
 
         # -------- DOWNLOAD SECTION --------
         st.markdown("### 💾 Download Filtered Denial Data")
-        download_button(filtered_df, filename="filtered_denials.csv")
+        # Same cached row mask, applied to every column so the export matches the upload
+        export_df = data_table.filter(pa.array(filter_mask(filter_key, df))).to_pandas(split_blocks=True)
+        download_button(export_df, filename="filtered_denials.csv", cache_key=filter_key)